@@ -4,8 +4,10 @@ import multiprocessing
 import os
 import shutil
 from typing import Any, Literal
+
+import aiohttp
 from app.config import images_cache_path, speech_cache_path
-from app.utils.path_util import download_resource
+from app.utils.path_util import create_http_session, download_resource
 from app.utils.strings import FileClip
 
 
@@ -14,7 +16,7 @@ from dotenv import load_dotenv
 from loguru import logger
 from pydantic import BaseModel
 from app.image_gen import ImageGenerator, ImageGeneratorConfig
-from app.prompt_gen import PromptGenerator
+from app.prompt_gen import PromptGenerator, StoryMiscResponse
 from app.subtitle_gen import SubtitleGenerator
 from app.synth_gen import SynthConfig, SynthGenerator
 from app.video_gen import VideoGenerator, VideoGeneratorConfig
@@ -92,9 +94,18 @@ class BaseGeneratorConfig(BaseModel):
 class StartResponse(BaseModel):
     video_file_path: str
 
+    misc_info: StoryMiscResponse | None = None
+    """ hook title, post title and hashtags, when they were generated """
+
 
 class BaseEngine(ABC):
-    def __init__(self, config: BaseGeneratorConfig):
+    def __init__(
+        self,
+        config: BaseGeneratorConfig,
+        prompt_generator: PromptGenerator | None = None,
+        encode_semaphore: asyncio.Semaphore | None = None,
+        http_session: aiohttp.ClientSession | None = None,
+    ):
         self.config = config
         self.cwd = config.cwd
 
@@ -102,19 +113,44 @@ class BaseEngine(ABC):
         self.video_generator = VideoGenerator(self)
 
         self.synth_generator = SynthGenerator(self.cwd, config.synth_config)
-        self.prompt_generator = PromptGenerator()
+        # long running workers can share one generator between jobs
+        self.prompt_generator = prompt_generator or PromptGenerator()
+
+        # shared between jobs to cap how many ffmpeg encodes run at once
+        self.encode_semaphore = encode_semaphore
         self.image_generator = ImageGenerator(self.cwd, self.config.image_gen_config)
         self.threads: int = multiprocessing.cpu_count()
 
         self.db_available = True
+
+        self.http_session: aiohttp.ClientSession | None = http_session
+        """ pooled http session, only open while the engine is running unless shared by the caller """
+
+        self.owns_http_session = http_session is None
  
     async def start(self) -> Any | StartResponse:
         pass
+
+    def open_http_session(self) -> aiohttp.ClientSession:
+        # a session shared by the caller outlives this engine, reuse it as is
+        if not self.owns_http_session and self.http_session:
+            return self.http_session
+
+        self.http_session = create_http_session()
+        return self.http_session
+
+    async def close_http_session(self):
+        if self.owns_http_session and self.http_session:
+            await self.http_session.close()
+            self.http_session = None
  
     @retry(stop=stop_after_attempt(3), wait=wait_fixed(5), after=log_attempt_number) # type: ignore
     async def post_complete(self, data: StartResponse):
 
-        logger.debug(f"Post complete started with: {data.model_dump_json(indent=3)}")
+        logger.opt(lazy=True).debug(
+            "Post complete started with: {data}",
+            data=lambda: data.model_dump_json(indent=3),
+        )
         gif_path = await self.video_generator.create_gif(data.video_file_path)
         await self.cleanup()
 
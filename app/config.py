@@ -18,6 +18,7 @@ audios_cache_path = os.path.join(parent, "cache/audios_cache")
 images_cache_path = os.path.join(parent, "cache/images_cache")
 fonts_cache_path = os.path.join(parent, "cache/fonts_cache")
 llm_cache_path = os.path.join(parent, "cache/llm_cache")
+pexels_cache_path = os.path.join(parent, "cache/pexels_cache")
 
 
 def ensure_caches():
@@ -27,6 +28,7 @@ def ensure_caches():
     os.makedirs(images_cache_path, exist_ok=True)
     os.makedirs(fonts_cache_path, exist_ok=True)
     os.makedirs(llm_cache_path, exist_ok=True)
+    os.makedirs(pexels_cache_path, exist_ok=True)
 
 
 ensure_caches()
@@ -63,4 +65,4 @@ class __Settings(BaseSettings):
 settings = __Settings()  # type: ignore
 
 if not mode == "production":
-    logger.debug(settings.model_dump_json(indent=3))
\ No newline at end of file
+    logger.opt(lazy=True).debug("{s}", s=lambda: settings.model_dump_json(indent=3))
\ No newline at end of file
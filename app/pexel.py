@@ -1,39 +1,113 @@
+import json
 import os
+import tempfile
+
+import aiohttp
 from loguru import logger
-import requests
 
+from app.config import pexels_cache_path
+from app.utils.path_util import create_http_session, text_to_sha256_hash
+
+# the 1080x1920 output, every clip is scaled to it without cropping
+OUTPUT_WIDTH, OUTPUT_HEIGHT = 1080, 1920
+
+# only portrait videos fill the output without being stretched
+ORIENTATION = "portrait"
+
+
+async def search_for_stock_videos(
+    query: str,
+    limit: int,
+    min_dur: int,
+    session: aiohttp.ClientSession | None = None,
+) -> list[str]:
+    # search results are cached on disk, reruns of the same prompt skip the api
+    cache_path = os.path.join(
+        pexels_cache_path, f"{text_to_sha256_hash(f'{query}|{limit}|{min_dur}|{ORIENTATION}')}.json"
+    )
+    cached = read_cached_search(cache_path)
+    if cached is not None:
+        logger.info(f"Found pexels search in cache: {query}")
+        return cached
+
+    if session is None:
+        async with create_http_session() as session:
+            return await search_for_stock_videos(query, limit, min_dur, session)
 
-async def search_for_stock_videos(query: str, limit: int, min_dur: int) -> list[str]:
     headers = {
-        "Authorization": os.getenv("PEXELS_API_KEY"),
+        "Authorization": os.getenv("PEXELS_API_KEY", ""),
     }
 
-    qurl = f"https://api.pexels.com/videos/search?query={query}&per_page={limit}"
+    qurl = "https://api.pexels.com/videos/search"
+    params = {"query": query, "per_page": limit, "orientation": ORIENTATION}
 
-    r = requests.get(qurl, headers=headers)
-    response = r.json()
+    async with session.get(qurl, headers=headers, params=params) as r:
+        response = await r.json()
 
-    raw_urls = []
     video_urls = []
-    video_res = 0
 
     try:
         for i in range(limit):
             if response["videos"][i]["duration"] < min_dur:
                 continue
-            raw_urls = response["videos"][i]["video_files"]
-            temp_video_url = ""
-
-            for video in raw_urls:
-                if ".com/video-files" in video["link"]:
-                    if (video["width"] * video["height"]) > video_res:
-                        temp_video_url = video["link"]
-                        video_res = video["width"] * video["height"]
 
-            if temp_video_url != "":
-                video_urls.append(temp_video_url)
+            video_url = pick_video_file(response["videos"][i]["video_files"])
+            if video_url:
+                video_urls.append(video_url)
 
     except Exception as e:
         logger.error(f"Error Searching for video: {e}")
 
+    if video_urls:
+        write_cached_search(cache_path, video_urls)
+
     return video_urls
+
+
+def read_cached_search(cache_path: str) -> list[str] | None:
+    """the cached video urls, None on a miss or an unreadable file"""
+    try:
+        with open(cache_path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable pexels cache {cache_path}: {e}")
+        return None
+
+
+def write_cached_search(cache_path: str, video_urls: list[str]):
+    # concurrent jobs search the same terms, write to a temp file and swap it
+    # in so a reader never sees a half written file
+    with tempfile.NamedTemporaryFile(
+        "w", dir=os.path.dirname(cache_path), suffix=".tmp", delete=False
+    ) as f:
+        json.dump(video_urls, f)
+    os.replace(f.name, cache_path)
+
+
+def pick_video_file(video_files: list[dict]) -> str | None:
+    """
+    Picks the smallest rendition that still covers the 1080x1920 output, larger files
+    only add download time and decode work. Falls back to the largest one.
+    """
+    candidates = [
+        video
+        for video in video_files
+        if ".com/video-files" in video["link"] and video.get("width") and video.get("height")
+    ]
+    if not candidates:
+        return None
+
+    def area(video: dict) -> int:
+        return video["width"] * video["height"]
+
+    covering = [
+        video
+        for video in candidates
+        if video["width"] >= OUTPUT_WIDTH and video["height"] >= OUTPUT_HEIGHT
+    ]
+    if covering:
+        return min(covering, key=area)["link"]
+
+    return max(candidates, key=area)["link"]
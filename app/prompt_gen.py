@@ -1,3 +1,4 @@
+import functools
 import random
 import typing
 from typing import Literal
@@ -8,6 +9,7 @@ from langchain.prompts import ChatPromptTemplate
 from langchain_core.globals import set_llm_cache
 from langchain_core.output_parsers import StrOutputParser
 from langchain_openai import ChatOpenAI
+import httpx
 from loguru import logger
 from pydantic import BaseModel, Field
 from app.config import settings
@@ -50,15 +52,74 @@ class StoryMiscResponse(BaseModel):
     )
 
 
+class ScriptDerivedSchema(BaseModel):
+    """video search terms and social media info, derived from a finished script in one call"""
+
+    search_terms: list[str] = Field(
+        description="List of stock video search terms that visually support the script"
+    )
+    hook_title: str = Field(
+        "",
+        description="Generate a hook for the story/script. eg: what will happen if the hunter kills the dragon?  Eg 2. Is Free Will an Illusion?",
+    )
+    post_title: str = Field(
+        "",
+        description="Generate a social media post title, for the beginning of the story/script",
+    )
+    hashtags: list[str] = Field(
+        [], description="Generate 8-12 relevant hashtags for the story/script"
+    )
+
+
+# parsers and their format instructions only depend on the schema, build them once
+_HASHTAGS_PARSER = PydanticOutputParser(pydantic_object=HashtagsSchema)
+_HASHTAGS_FMT = _HASHTAGS_PARSER.get_format_instructions()
+_IMAGE_PROMPTS_PARSER = PydanticOutputParser(pydantic_object=ImageLLMResponse)
+_IMAGE_PROMPTS_FMT = _IMAGE_PROMPTS_PARSER.get_format_instructions()
+_SCRIPT_DERIVED_PARSER = PydanticOutputParser(pydantic_object=ScriptDerivedSchema)
+_SCRIPT_DERIVED_FMT = _SCRIPT_DERIVED_PARSER.get_format_instructions()
+_STORY_MISC_PARSER = PydanticOutputParser(pydantic_object=StoryMiscResponse)
+_STORY_MISC_FMT = _STORY_MISC_PARSER.get_format_instructions()
+
+
 StoryPromptType = Literal["fantasy story", "motivational quote"] | str
 
 
+@functools.lru_cache(maxsize=1)
+def _init_cache():
+    """opens the sqlite llm cache once per process, later calls are a no-op"""
+    set_llm_cache(SQLiteCache(database_path=f"{llm_cache_path}/llm_cache.db"))
+
+
+def create_llm_http_client() -> httpx.AsyncClient:
+    """
+    one keep-alive pool for openai requests, so back to back calls don't pay a
+    new tls handshake. its connections are bound to the loop that opened them,
+    create it inside the running loop and close it before the loop ends
+    """
+    return httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+    )
+
+
+@functools.lru_cache
+def _get_model(
+    model_name: str, http_client: httpx.AsyncClient | None = None
+) -> ChatOpenAI:
+    # a fixed temperature keeps the prompt -> response mapping stable, so
+    # the llm cache can hit for keyword and misc info calls. the model is shared
+    # between generators, it must never be mutated, use .bind() per call instead
+    return ChatOpenAI(model=model_name, temperature=0, http_async_client=http_client)
+
+
 class PromptGenerator:
-    def __init__(self, test_mode: bool = False):
-        set_llm_cache(SQLiteCache(database_path=f"{llm_cache_path}/llm_cache.db"))
+    def __init__(
+        self, test_mode: bool = False, http_client: httpx.AsyncClient | None = None
+    ):
+        _init_cache()
 
         self.test_mode = test_mode
-        self.model = ChatOpenAI(model=settings.OPENAI_MODEL_NAME)
+        self.model = _get_model(settings.OPENAI_MODEL_NAME, http_client)
 
     async def genarate_script(
         self,
@@ -97,6 +158,14 @@ TOPIC: {sentence}
 Write ONLY the voiceover text. No music cues, no parentheses, no stage directions.
  """
 
+        logger.debug(f"Generating sentence from prompt: {sentence_prompt}")
+
+        # test mode only needs the rendered prompt, skip building the chain
+        if self.test_mode:
+            return user_tmpl.format(
+                video_type=video_type, sentence=sentence_prompt, duration=duration
+            )
+
         prompt = ChatPromptTemplate(
             [
                 ("system", system_tmpl),
@@ -104,16 +173,9 @@ Write ONLY the voiceover text. No music cues, no parentheses, no stage direction
             ]
         )
 
-        self.model.temperature = random.uniform(0.5, 1.2)
-        chain = prompt | self.model | StrOutputParser()
-
-        logger.debug(f"Generating sentence from prompt: {sentence_prompt}")
-
-        if self.test_mode:
-            p = prompt.format(
-                video_type=video_type, sentence=sentence_prompt, duration=duration
-            )
-            return p
+        # scripts should vary between runs, randomize the temperature for this call only
+        model = self.model.bind(temperature=random.uniform(0.5, 1.2))
+        chain = prompt | model | StrOutputParser()
 
         return await chain.ainvoke(
             {
@@ -177,7 +239,9 @@ PRIORITIZE keywords that will find:
 5. Modern, clean, and engaging footage
 
 AVOID generic terms like "success," "motivation," "business" - be specific.
+"""
 
+        user_template = """
 Generate exactly {max_keywords} precise search terms that will find the most relevant stock videos.
 
 {format_instructions}
@@ -185,12 +249,12 @@ Generate exactly {max_keywords} precise search terms that will find the most rel
 USER PROMPT: {user_prompt}
 """
 
-        parser = PydanticOutputParser(pydantic_object=HashtagsSchema)
+        parser = _HASHTAGS_PARSER
         prompt = ChatPromptTemplate.from_messages(
-            messages=[("system", system_template)]
+            messages=[("system", system_template), ("human", user_template)]
         )
         prompt = prompt.partial(
-            format_instructions=parser.get_format_instructions(),
+            format_instructions=_HASHTAGS_FMT,
             max_keywords=max_keywords
         )
 
@@ -205,20 +269,22 @@ USER PROMPT: {user_prompt}
         system_template = """
 generate pexels.com search terms for the sentence below, the search keywords will be used to query an API:
 
-{format_instructions}
-
 [(examples)]:
 Timing and letting go, Weakness and strength, Focus and hustle, Resonate with life etc...
+ """
+
+        user_template = """
+{format_instructions}
 
 [(sentence)]:
 {sentence}
  """
 
-        parser = PydanticOutputParser(pydantic_object=HashtagsSchema)
+        parser = _HASHTAGS_PARSER
         prompt = ChatPromptTemplate.from_messages(
-            messages=[("system", system_template), ("user", "{sentence}")]
+            messages=[("system", system_template), ("user", user_template)]
         )
-        prompt = prompt.partial(format_instructions=parser.get_format_instructions())
+        prompt = prompt.partial(format_instructions=_HASHTAGS_FMT)
 
         chain = prompt | self.model | parser
 
@@ -231,7 +297,7 @@ Timing and letting go, Weakness and strength, Focus and hustle, Resonate with li
         sentences: list[str],
         style: str,
     ) -> ImagePromptResponses:
-        user_template = """
+        system_template = """
 You are a master of crafting detailed visual narratives. Your task is to generate descriptions of scenes for an animator, based on a story. Each scene description will guide the animator in creating the corresponding visual frames for the video.
 Respond only with vivid, intricate descriptions of the scenes. Focus exclusively on providing the animator with everything they need to visualize characters, locations, and concepts clearly and consistently.
 
@@ -247,7 +313,9 @@ Examples:
 
 You will be penalized if descriptions are incomplete or lack detail, or if any additional text (headings, etc.) is included.
 The visual narrative should be rich and immersive, allowing the animator to seamlessly create MidJourney-style artwork from your descriptions.
+"""
 
+        user_template = """
 {format_instructions}
 
 [(Paragraphs)]:
@@ -256,13 +324,15 @@ The visual narrative should be rich and immersive, allowing the animator to seam
 You must generate a total of {total_count} descriptions, each preserving a coherent visual narrative and maintaining distinct character features throughout.
 """
 
-        parser = PydanticOutputParser(pydantic_object=ImageLLMResponse)
+        parser = _IMAGE_PROMPTS_PARSER
 
         formated_sentences = "- " + "\n- ".join(sentences)
 
-        prompt = ChatPromptTemplate.from_messages(messages=[("system", user_template)])
+        prompt = ChatPromptTemplate.from_messages(
+            messages=[("system", system_template), ("human", user_template)]
+        )
         prompt = prompt.partial(
-            format_instructions=parser.get_format_instructions(),
+            format_instructions=_IMAGE_PROMPTS_FMT,
             total_count=len(sentences),
         )
 
@@ -282,12 +352,62 @@ You must generate a total of {total_count} descriptions, each preserving a coher
             sentences=sentences, image_prompts=data.image_prompts
         )
 
+    async def generate_script_derived(
+        self, script: str, max_keywords: int = 10
+    ) -> ScriptDerivedSchema:
+        """generates video search keywords and misc info from a script in a single call"""
+
+        system_template = """
+You are an expert video content curator and social media editor. From the script below you must:
+
+1. Generate exactly the requested number of precise search terms for finding professional stock videos that visually support the script:
+- People in action related to the topic
+- Professional environments/workspaces
+- Technology, tools, or relevant objects
+- Conceptual visuals that represent the ideas
+- Modern, clean, and engaging footage
+AVOID generic terms like "success," "motivation," "business" - be specific.
+
+2. Extract a hook title, a social media post title and relevant hashtags for the script.
+"""
+
+        user_template = """
+Number of search terms: {max_keywords}
+
+{format_instructions}
+
+[(Script)]:
+{script}
+"""
+
+        parser = _SCRIPT_DERIVED_PARSER
+        prompt = ChatPromptTemplate.from_messages(
+            messages=[("system", system_template), ("human", user_template)]
+        )
+        prompt = prompt.partial(
+            format_instructions=_SCRIPT_DERIVED_FMT,
+            max_keywords=max_keywords,
+        )
+
+        chain = prompt | self.model | parser
+
+        logger.debug("Generating video keywords and misc info from script")
+        data = await chain.ainvoke({"script": script})
+        data = typing.cast(ScriptDerivedSchema, data)
+
+        # removed # from hashtags - we only need the tag for social media
+        data.hashtags = [tag.lstrip("#") for tag in data.hashtags]
+
+        return data
+
     async def generate_video_misc_info(self, script: str) -> StoryMiscResponse:
         """generates video misc info from a script"""
 
         system_template = """
 Extracts relevant information from the script below.
+"""
 
+        user_template = """
 {format_instructions}
 
 [(Script)]:
@@ -296,13 +416,13 @@ Extracts relevant information from the script below.
 
         logger.debug("Generating video misc info")
 
-        parser = PydanticOutputParser(pydantic_object=StoryMiscResponse)
+        parser = _STORY_MISC_PARSER
 
         prompt = ChatPromptTemplate.from_messages(
-            messages=[("system", system_template)]
+            messages=[("system", system_template), ("human", user_template)]
         )
         prompt = prompt.partial(
-            format_instructions=parser.get_format_instructions(),
+            format_instructions=_STORY_MISC_FMT,
         )
 
         chain = prompt | self.model | parser
@@ -310,9 +430,6 @@ Extracts relevant information from the script below.
         data = typing.cast(StoryMiscResponse, data)
 
         # removed # from hashtags - we only need the tag for social media
-        data.hashtags = [
-            tag if not tag.startswith("#") else tag.replace("#", "")
-            for tag in data.hashtags
-        ]
+        data.hashtags = [tag.lstrip("#") for tag in data.hashtags]
 
         return data
@@ -1,6 +1,7 @@
 import asyncio
 import os
 
+import aiohttp
 import ffmpeg
 from loguru import logger
 
@@ -11,8 +12,13 @@ from app.base import (
     StartResponse,
     TempData,
 )
-from app.utils.strings import split_by_dot_or_newline
-from app.utils.path_util import download_resource
+from app.prompt_gen import PromptGenerator, ScriptDerivedSchema, StoryMiscResponse
+from app.utils.strings import (
+    gather_or_cancel,
+    probe_durations,
+    split_by_dot_or_newline,
+)
+from app.utils.path_util import download_resource, download_resources
 
 
 class ReelsMakerConfig(BaseGeneratorConfig):
@@ -23,26 +29,29 @@ class ReelsMakerConfig(BaseGeneratorConfig):
     """ List of custom background video URLs or local file paths to use (sports, action, or any engaging content) """
 
 
-def create_concat_file(clips):
-    concat_filename = "concat_list.txt"
-    with open(concat_filename, "w") as f:
-        for clip in clips:
-            f.write(f"file '{clip}'\n")
-    return concat_filename
-
+def _concat_bytes(clips) -> bytes:
+    """the concat demuxer list, with paths absolute and apostrophes escaped"""
+    lines = []
+    for clip in clips:
+        path = os.path.abspath(clip).replace("'", "'\\''")
+        lines.append(f"file '{path}'")
+    return ("\n".join(lines) + "\n").encode()
 
-def concatenate_with_filelist(clips, output_path):
-    concat_filename = create_concat_file(clips)
 
-    # Run FFmpeg with the concat demuxer
-    ffmpeg.input(concat_filename, format="concat", safe=0).output(
-        output_path, c="copy"
-    ).run(overwrite_output=True)
+async def concatenate_with_filelist(clips, output_path):
+    # Run FFmpeg with the concat demuxer, the list is fed through stdin so
+    # parallel jobs never share a list file
+    stream = ffmpeg.input(
+        "pipe:", format="concat", safe=0, protocol_whitelist="pipe,file"
+    ).output(output_path, c="copy")
+    await asyncio.to_thread(
+        stream.run, input=_concat_bytes(clips), overwrite_output=True
+    )
 
     return output_path
 
 
-def concatenate_clips(clips, output_path):
+async def concatenate_clips(clips, output_path):
     """
     Concatenates a list of video clips.
     Args:
@@ -56,17 +65,67 @@ def concatenate_clips(clips, output_path):
     concatenated_stream = ffmpeg.concat(*streams, v=1, a=1).output(output_path)
 
     # Run FFmpeg
-    concatenated_stream.run(overwrite_output=True)
+    await asyncio.to_thread(concatenated_stream.run, overwrite_output=True)
     return output_path
 
 
+# remainders shorter than this are float noise, ffmpeg rejects them as -t
+MIN_SLICE_DURATION = 0.01
+
+
+def plan_clip_slices(
+    durations: list[float], video_duration: float, max_clip_duration: float
+) -> list[tuple[int, float]]:
+    """
+    Tiles the clips round-robin until video_duration is covered.
+    Returns (clip index, slice duration) pairs, each slice is at most max_clip_duration
+    and never longer than its clip.
+    """
+    per_clip = [min(max_clip_duration, duration) for duration in durations]
+    total_cycle = sum(per_clip)
+    if total_cycle <= 0:
+        raise ValueError("Background videos have no usable duration")
+
+    # clips without duration would only add empty slices
+    cycle = [(i, d) for i, d in enumerate(per_clip) if d > 0]
+
+    cycles, remaining = divmod(video_duration, total_cycle)
+    plan = cycle * int(cycles)
+
+    for i, d in cycle:
+        if remaining < MIN_SLICE_DURATION:
+            break
+        d = min(d, remaining)
+        plan.append((i, d))
+        remaining -= d
+
+    return plan
+
+
+def is_valid_download(path: str) -> bool:
+    """quick validation that the file exists and has at least 1KB, in a single stat call"""
+    try:
+        return os.stat(path).st_size > 1024
+    except OSError:
+        return False
+
+
 class ReelsMaker(BaseEngine):
-    def __init__(self, config: ReelsMakerConfig):
-        super().__init__(config)
+    def __init__(
+        self,
+        config: ReelsMakerConfig,
+        prompt_generator: PromptGenerator | None = None,
+        encode_semaphore: asyncio.Semaphore | None = None,
+        http_session: aiohttp.ClientSession | None = None,
+    ):
+        super().__init__(config, prompt_generator, encode_semaphore, http_session)
 
         self.config = config
 
-        logger.info(f"Starting Reels Maker with: {self.config.model_dump()}")
+        # the dump only runs when the message is actually logged
+        logger.opt(lazy=True).info(
+            "Starting Reels Maker with: {config}", config=lambda: self.config.model_dump()
+        )
 
     async def generate_script(self, sentence: str):
         logger.debug(f"Generating script from prompt: {sentence}")
@@ -78,19 +137,22 @@ class ReelsMaker(BaseEngine):
         )
         return sentence.replace('"', "")
 
-    async def generate_search_terms(self, user_prompt: str, max_hashtags: int = 10):
-        logger.debug("Generating enhanced search terms from user prompt...")
-        response = await self.prompt_generator.generate_enhanced_video_keywords(
-            user_prompt=user_prompt, 
-            max_keywords=max_hashtags
+    async def generate_script_derived(
+        self, script: str, max_hashtags: int = 10
+    ) -> ScriptDerivedSchema:
+        logger.debug("Generating search terms and misc info from script...")
+        response = await self.prompt_generator.generate_script_derived(
+            script=script,
+            max_keywords=max_hashtags,
         )
-        tags = [tag.replace("#", "") for tag in response.sentences]
+        tags = [tag.lstrip("#") for tag in response.search_terms]
         if len(tags) > max_hashtags:
             logger.warning(f"Truncated search terms to {max_hashtags} tags")
             tags = tags[:max_hashtags]
 
+        response.search_terms = tags
         logger.info(f"Generated enhanced search terms: {tags}")
-        return tags
+        return response
 
     async def get_subway_surfers_videos(self) -> list[str]:
         """Get Subway Surfers or engaging background videos"""
@@ -118,18 +180,23 @@ class ReelsMaker(BaseEngine):
         
         remote_urls = []
         max_videos = int(os.getenv("MAX_BG_VIDEOS", 8))
-        
-        for search_term in sports_search_terms[:max_videos]:
-            logger.debug(f"🔍 Searching for: {search_term}")
-            try:
-                video_url = await self.video_generator.get_video_url(search_term=search_term)
-                if video_url:
-                    remote_urls.append(video_url)
-                    logger.success(f"✅ Found sports video for: {search_term}")
-                else:
-                    logger.warning(f"❌ No video found for: {search_term}")
-            except Exception as e:
-                logger.warning(f"Error searching for {search_term}: {e}")
+        search_terms = sports_search_terms[:max_videos]
+
+        # search for all terms at once
+        url_tasks = [
+            self.video_generator.get_video_url(search_term=search_term)
+            for search_term in search_terms
+        ]
+        results = await asyncio.gather(*url_tasks, return_exceptions=True)
+
+        for search_term, video_url in zip(search_terms, results):
+            if isinstance(video_url, Exception):
+                logger.warning(f"Error searching for {search_term}: {video_url}")
+            elif video_url:
+                remote_urls.append(video_url)
+                logger.success(f"✅ Found sports video for: {search_term}")
+            else:
+                logger.warning(f"❌ No video found for: {search_term}")
         
         if not remote_urls:
             logger.error("❌ No sports videos found! Please provide your own videos in subway_surfers_videos config.")
@@ -138,28 +205,11 @@ class ReelsMaker(BaseEngine):
         logger.success(f"🏀 Found {len(remote_urls)} dynamic sports videos!")
         return remote_urls
 
-    async def start(self) -> StartResponse:
-        await super().start()
-
-        self.background_music_path = None
-        if self.config.background_audio_url:
-            self.background_music_path = await download_resource(
-                self.cwd, self.config.background_audio_url
-            )
-
-        # generate script from prompt
-        if self.config.prompt:
-            script = await self.generate_script(self.config.prompt)
-        elif self.config.script:
-            script = self.config.script
-        else:
-            raise ValueError("No prompt or sentence provided")
-
-        # split script into sentences
-        assert script is not None, "Script should not be None"
-
-        sentences = split_by_dot_or_newline(script, 100)
-        sentences = list(filter(lambda x: x != "", sentences))
+    async def get_background_videos(
+        self, script: str
+    ) -> tuple[list[str], StoryMiscResponse | None]:
+        """returns the local background video paths, and the post info when it was generated"""
+        misc_info: StoryMiscResponse | None = None
 
         video_paths = []
         if self.config.video_paths:
@@ -172,17 +222,15 @@ class ReelsMaker(BaseEngine):
             
             # Handle both local files and remote URLs
             valid_paths = []
-            tasks = []
+            download_urls = []
             
             for video_source in subway_surfers_urls:
                 # Check if it's a local file or remote URL
                 if video_source.startswith(('http://', 'https://')):
                     # Remote URL - download it
-                    task = asyncio.create_task(download_resource(self.cwd, video_source))
-                    tasks.append(task)
+                    download_urls.append(video_source)
                 else:
                     # Local file - use directly
-                    import os
                     if os.path.exists(video_source):
                         logger.success(f"✅ Using local Subway Surfers video: {video_source}")
                         valid_paths.append(video_source)
@@ -190,69 +238,138 @@ class ReelsMaker(BaseEngine):
                         logger.warning(f"❌ Local file not found: {video_source}")
 
             # Download remote files if any
-            if tasks:
-                local_paths = await asyncio.gather(*tasks, return_exceptions=True)
+            if download_urls:
+                # the same video found twice would be downloaded twice to one path
+                local_paths = await download_resources(
+                    self.cwd,
+                    list(dict.fromkeys(download_urls)),
+                    session=self.http_session,
+                    return_exceptions=True,
+                )
                 
                 # Filter out None values and exceptions, keep only valid video paths
                 for path in local_paths:
                     if path and not isinstance(path, Exception):
-                        try:
-                            # Quick validation that file exists and has size > 0
-                            import os
-                            if os.path.exists(path) and os.path.getsize(path) > 1024:  # At least 1KB
-                                valid_paths.append(path)
-                            else:
-                                logger.warning(f"Skipping corrupted video: {path}")
-                        except Exception as e:
-                            logger.warning(f"Error validating video {path}: {e}")
+                        if is_valid_download(path):
+                            valid_paths.append(path)
+                        else:
+                            logger.warning(f"Skipping corrupted video: {path}")
                         
             video_paths.extend(valid_paths)
             
             logger.success(f"🎮 Using {len(video_paths)} Subway Surfers background videos!")
         else:
-            logger.debug("Generating enhanced search terms from user prompt...")
-            search_terms = await self.generate_search_terms(
-                user_prompt=self.config.prompt, max_hashtags=10
+            # search terms and post info both derive from the script, ask for them at once
+            derived = await self.generate_script_derived(script=script, max_hashtags=10)
+            search_terms = derived.search_terms
+            misc_info = StoryMiscResponse(
+                hook_title=derived.hook_title,
+                post_title=derived.post_title,
+                hashtags=derived.hashtags,
             )
 
-            # holds all remote urls
-            remote_urls = []
-
             max_videos = int(os.getenv("MAX_BG_VIDEOS", 10))
 
-            for search_term in search_terms[:max_videos]:
-                # search for a related background video
-                video_path = await self.video_generator.get_video_url(
-                    search_term=search_term
+            # search for a related background video for every term at once
+            url_tasks = [
+                self.video_generator.get_video_url(search_term=search_term)
+                for search_term in search_terms[:max_videos]
+            ]
+            results = await asyncio.gather(*url_tasks, return_exceptions=True)
+
+            # holds all remote urls, search terms often share their top video
+            remote_urls = list(
+                dict.fromkeys(
+                    url for url in results if url and not isinstance(url, Exception)
                 )
-                if not video_path:
-                    continue
-
-                remote_urls.append(video_path)
+            )
 
             # download all remote videos at once
-            tasks = []
-            for url in remote_urls:
-                task = asyncio.create_task(download_resource(self.cwd, url))
-                tasks.append(task)
+            local_paths = await download_resources(
+                self.cwd, remote_urls, session=self.http_session
+            )
+            video_paths.extend(local_paths)
 
-            local_paths = await asyncio.gather(*tasks)
-            video_paths.extend(set(local_paths))
+        # dedupe while keeping order, each duplicate would be probed and sliced
+        # again. urls are deduped before downloading, this covers config.video_paths
+        video_paths = list(dict.fromkeys(video_paths))
 
         if len(video_paths) == 0:
             raise ValueError("No video paths found available")
 
-        data: list[TempData] = []
+        return video_paths, misc_info
 
-        # for each sentence, generate audio
-        for sentence in sentences:
-            audio_path = await self.synth_generator.synth_speech(sentence)
-            data.append(
-                TempData(
-                    synth_clip=FileClip(audio_path),
-                )
+    async def start(self) -> StartResponse:
+        await super().start()
+
+        # one pooled session for every pexels query and download of this job
+        self.open_http_session()
+        try:
+            return await self.make_reel()
+        finally:
+            await self.close_http_session()
+
+    async def make_reel(self) -> StartResponse:
+        self.background_music_path = None
+        if self.config.background_audio_url:
+            self.background_music_path = await download_resource(
+                self.cwd, self.config.background_audio_url, session=self.http_session
             )
 
+        # generate script from prompt
+        if self.config.prompt:
+            script = await self.generate_script(self.config.prompt)
+        elif self.config.script:
+            script = self.config.script
+        else:
+            raise ValueError("No prompt or sentence provided")
+
+        # split script into sentences
+        assert script is not None, "Script should not be None"
+
+        sentences = split_by_dot_or_newline(script, 100)
+        sentences = list(filter(lambda x: x != "", sentences))
+
+        # background videos and speech don't depend on each other, fetch and
+        # synthesize at the same time so the encode can start sooner. if one
+        # side fails the other is cancelled, so it doesn't keep using the session
+        (video_paths, misc_info), audio_paths = await gather_or_cancel(
+            self.get_background_videos(script),
+            self.synth_generator.synth_speeches(sentences),
+        )
+
+        audio_durations = await probe_durations(audio_paths)
+
+        # a silent sentence would shift every subtitle after it
+        for audio_path, duration in zip(audio_paths, audio_durations):
+            if duration <= 0:
+                raise ValueError(f"Unreadable speech file: {audio_path}")
+
+        # subtitles only depend on the speech durations, generate them while
+        # the background videos are probed
+        subtitles_path, video_durations = await gather_or_cancel(
+            self.subtitle_generator.generate_subtitles(
+                sentences=sentences, durations=audio_durations
+            ),
+            probe_durations(video_paths),
+        )
+
+        # a file ffprobe can't read would only make ffmpeg fail mid-assembly
+        for video_path, duration in zip(video_paths, video_durations):
+            if duration <= 0:
+                logger.warning(f"Skipping unreadable background video: {video_path}")
+        video_paths, video_durations = (
+            [p for p, d in zip(video_paths, video_durations) if d > 0],
+            [d for d in video_durations if d > 0],
+        )
+        if len(video_paths) == 0:
+            raise ValueError("No readable background videos available")
+
+        data: list[TempData] = [
+            TempData(synth_clip=FileClip(audio_path, real_duration=duration))
+            for audio_path, duration in zip(audio_paths, audio_durations)
+        ]
+
         # TODO: fix me
         self.video_generator.config.background_music_path = self.background_music_path
 
@@ -260,44 +377,45 @@ class ReelsMaker(BaseEngine):
             *[item.synth_clip.ffmpeg_clip for item in data], v=0, a=1
         )
 
-        # get subtitles from script
-        subtitles_path = await self.subtitle_generator.generate_subtitles(
-            sentences=sentences,
-            durations=[item.synth_clip.real_duration for item in data],
-        )
-
         # the max duration of the final video
         video_duration = sum(item.synth_clip.real_duration for item in data)
 
         # each clip should be 5 seconds long
         max_clip_duration = 5
 
-        tot_dur: float = 0
-
         temp_videoclip: list[FileClip] = [
-            FileClip(video_path, t=max_clip_duration) for video_path in video_paths
+            FileClip(video_path, real_duration=duration, t=max_clip_duration)
+            for video_path, duration in zip(video_paths, video_durations)
         ]
 
-        final_clips: list[FileClip] = []
-
-        while tot_dur < video_duration:
-            for clip in temp_videoclip:
-                remaining_dur = video_duration - tot_dur
-                subclip_duration = min(
-                    max_clip_duration, remaining_dur, clip.real_duration
-                )
-                subclip = FileClip(clip.filepath, t=subclip_duration).duplicate()
-
-                final_clips.append(subclip)
-                tot_dur += subclip_duration
+        # plan the (clip, duration) slices first, without touching any file
+        plan: list[tuple[FileClip, float]] = [
+            (temp_videoclip[i], subclip_duration)
+            for i, subclip_duration in plan_clip_slices(
+                durations=[clip.real_duration for clip in temp_videoclip],
+                video_duration=video_duration,
+                max_clip_duration=max_clip_duration,
+            )
+        ]
+        logger.debug(f"Planned {len(plan)} background slices for {video_duration}s")
 
-                logger.debug(
-                    f"Total duration after adding this clip: {tot_dur}, target is {video_duration}, clip duration: {subclip_duration}"
+        # the first slice of a file uses it directly, later ones need a distinct
+        # path, durations are carried over so nothing is probed again
+        final_clips: list[FileClip] = []
+        used_paths: set[str] = set()
+        for clip, subclip_duration in plan:
+            if clip.filepath in used_paths:
+                final_clips.append(clip.duplicate(t=subclip_duration))
+            else:
+                used_paths.add(clip.filepath)
+                final_clips.append(
+                    FileClip(
+                        clip.filepath,
+                        real_duration=clip.real_duration,
+                        t=subclip_duration,
+                    )
                 )
 
-                if tot_dur >= video_duration:
-                    break
-
         final_video_path = await self.video_generator.generate_video(
             clips=final_clips,
             subtitles_path=subtitles_path,
@@ -310,4 +428,5 @@ class ReelsMaker(BaseEngine):
 
         return StartResponse(
             video_file_path=final_video_path,
+            misc_info=misc_info,
         )
\ No newline at end of file
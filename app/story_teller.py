@@ -42,8 +42,9 @@ class StoryTeller(BaseEngine):
                 )
             )
 
-        logger.info(
-            f"Starting story teller with: {self.config.model_dump_json(indent=3)}"
+        logger.opt(lazy=True).info(
+            "Starting story teller with: {config}",
+            config=lambda: self.config.model_dump_json(indent=3),
         )
 
         script = self.config.script
@@ -1,3 +1,4 @@
+import asyncio
 import os
 from datetime import timedelta
 
@@ -43,7 +44,9 @@ class SubtitleGenerator:
         ----------------
         """
 
-        srt_equalizer.equalize_srt_file(srt_path, srt_path, max_chars)
+        await asyncio.to_thread(
+            srt_equalizer.equalize_srt_file, srt_path, srt_path, max_chars
+        )
 
     async def generate_subtitles(
         self,
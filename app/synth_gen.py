@@ -1,3 +1,4 @@
+import asyncio
 import os
 import shutil
 from typing import Literal
@@ -8,7 +9,7 @@ from elevenlabs import Voice, VoiceSettings, save
 from elevenlabs.client import ElevenLabs
 import httpx
 from loguru import logger
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from app import tiktokvoice
 from app.config import speech_cache_path
@@ -25,12 +26,16 @@ class SynthConfig(BaseModel):
     static_mode: bool = False
     """ if we're generating static audio for test """
 
+    tts_concurrency: int = Field(
+        default_factory=lambda: int(os.getenv("TTS_CONCURRENCY", 4)), ge=1
+    )
+    """ max number of sentences synthesized at the same time """
+
 
 class SynthGenerator:
     def __init__(self, cwd: str, config: SynthConfig):
         self.config = config
         self.cwd = cwd
-        self.cache_key: str | None = None
 
         self.base = os.path.join(self.cwd, "audio_chunks")
 
@@ -40,21 +45,26 @@ class SynthGenerator:
             api_key=os.getenv("ELEVENLABS_API_KEY"),
         )
 
-    def set_speech_props(self):
+        # caps the number of in-flight requests to the voice provider
+        self.semaphore = asyncio.Semaphore(self.config.tts_concurrency)
+
+    def get_speech_props(self, text: str) -> tuple[str, str]:
+        """returns the (speech_path, cache_key) for a text, without touching shared state"""
         ky = (
             self.config.voice
             if self.config.static_mode
             else make_cuid(self.config.voice + "_")
         )
-        self.speech_path = os.path.join(
+        speech_path = os.path.join(
             self.base,
             f"{self.config.voice_provider}_{ky}.mp3",
         )
-        text_hash = text_to_sha256_hash(self.text)
+        text_hash = text_to_sha256_hash(text)
 
-        self.cache_key = f"{self.config.voice}_{text_hash}"
+        cache_key = f"{self.config.voice}_{text_hash}"
+        return speech_path, cache_key
 
-    async def generate_with_eleven(self, text: str) -> str:
+    async def generate_with_eleven(self, text: str, speech_path: str) -> str:
         voice = Voice(
             voice_id=self.config.voice,
             settings=VoiceSettings(
@@ -62,50 +72,63 @@ class SynthGenerator:
             ),
         )
 
-        audio = self.client.generate(
-            text=text, voice=voice, model="eleven_multilingual_v2", stream=False
-        )
+        # the elevenlabs client is sync, keep it off the event loop
+        def _generate():
+            audio = self.client.generate(
+                text=text, voice=voice, model="eleven_multilingual_v2", stream=False
+            )
+            save(audio, speech_path)
 
-        save(audio, self.speech_path)
+        await asyncio.to_thread(_generate)
 
-        return self.speech_path
+        return speech_path
 
-    async def generate_with_tiktok(self, text: str) -> str:
-        tiktokvoice.tts(text, voice=str(self.config.voice), filename=self.speech_path)
+    async def generate_with_tiktok(self, text: str, speech_path: str) -> str:
+        await asyncio.to_thread(
+            tiktokvoice.tts, text, voice=str(self.config.voice), filename=speech_path
+        )
 
-        return self.speech_path
+        return speech_path
 
-    async def cache_speech(self, text: str):
+    async def cache_speech(self, speech_path: str, cache_key: str | None):
         try:
-            if not self.cache_key:
+            if not cache_key:
                 logger.warning("Skipping speech cache because it is not set")
                 return
 
-            speech_path = os.path.join(speech_cache_path, f"{self.cache_key}.mp3")
-            shutil.copy2(self.speech_path, speech_path)
+            cached_path = os.path.join(speech_cache_path, f"{cache_key}.mp3")
+            shutil.copy2(speech_path, cached_path)
         except Exception as e:
             logger.exception(f"Error in cache_speech(): {e}")
 
-    async def generate_with_openai(self, text: str) -> str:
+    async def generate_with_openai(self, text: str, speech_path: str) -> str:
         raise NotImplementedError
 
-    async def generate_with_airforce(self, text: str) -> str:
+    async def generate_with_airforce(self, text: str, speech_path: str) -> str:
         url = f"https://api.airforce/get-audio?text={text}&voice={self.config.voice}"
         async with httpx.AsyncClient() as client:
             res = await client.get(url)
-            save(res.content, self.speech_path)
-        return self.speech_path
+            save(res.content, speech_path)
+        return speech_path
+
+    async def synth_speeches(self, texts: list[str]) -> list[str]:
+        """synthesizes all texts concurrently, results are in the same order as texts"""
+
+        async def _bounded(text: str) -> str:
+            async with self.semaphore:
+                return await self.synth_speech(text)
+
+        return list(await asyncio.gather(*(_bounded(text) for text in texts)))
 
     @retry(stop=stop_after_attempt(3), wait=wait_fixed(4), after=log_attempt_number) # type: ignore
     async def synth_speech(self, text: str) -> str:
-        self.text = text
-        self.set_speech_props()
+        speech_path, cache_key = self.get_speech_props(text)
 
-        cached_speech = search_file(speech_cache_path, self.cache_key)
+        cached_speech = search_file(speech_cache_path, cache_key)
 
         if cached_speech:
             logger.info(f"Found speech in cache: {cached_speech}")
-            shutil.copy2(cached_speech, self.speech_path)
+            shutil.copy2(cached_speech, speech_path)
             return cached_speech
 
         logger.info(f"Synthesizing text: {text}")
@@ -125,8 +148,13 @@ class SynthGenerator:
                 f"voice provider {self.config.voice_provider} is not recognized"
             )
 
-        speech_path = await genarator(text)
+        speech_path = await genarator(text, speech_path)
+
+        # tiktokvoice logs its errors and returns without a file, raising here
+        # lets the retry kick in instead of ffmpeg failing at the final encode
+        if not os.path.exists(speech_path) or os.path.getsize(speech_path) == 0:
+            raise ValueError(f"No speech was synthesized for: {text}")
 
-        await self.cache_speech(text)
+        await self.cache_speech(speech_path, cache_key)
 
         return speech_path
\ No newline at end of file
@@ -70,6 +70,8 @@ ENDPOINTS = [
     "https://tiktoktts.com/api/tiktok-tts",
 ]
 current_endpoint = 0
+# tts() runs in several threads at once, only one of them updates the endpoint
+endpoint_lock = threading.Lock()
 # in one conversion, the text can have a maximum length of 300 characters
 TEXT_BYTE_LIMIT = 300
 
@@ -94,8 +96,8 @@ def split_string(string: str, chunk_size: int) -> List[str]:
 
 
 # checking if the website that provides the service is available
-def get_api_response() -> requests.Response:
-    url = f'{ENDPOINTS[current_endpoint].split("/a")[0]}'
+def get_api_response(endpoint: int) -> requests.Response:
+    url = f'{ENDPOINTS[endpoint].split("/a")[0]}'
     response = requests.get(url)
     return response
 
@@ -108,8 +110,8 @@ def save_audio_file(base64_data: str, filename: str = "output.mp3") -> None:
 
 
 # send POST request to get the audio data
-def generate_audio(text: str, voice: str) -> bytes:
-    url = f"{ENDPOINTS[current_endpoint]}"
+def generate_audio(text: str, voice: str, endpoint: int) -> bytes:
+    url = f"{ENDPOINTS[endpoint]}"
     headers = {"Content-Type": "application/json"}
     data = {"text": text, "voice": voice}
     response = requests.post(url, headers=headers, json=data)
@@ -126,11 +128,17 @@ def tts(
     # checking if the website is available
     global current_endpoint
 
-    if get_api_response().status_code == 200:
+    # this call keeps the endpoint it checked, another thread switching the
+    # shared one can't change how this response is parsed
+    endpoint = current_endpoint
+    if get_api_response(endpoint).status_code == 200:
         print(colored("[+] TikTok TTS Service available!", "green"))
     else:
-        current_endpoint = (current_endpoint + 1) % 2
-        if get_api_response().status_code == 200:
+        endpoint = (endpoint + 1) % 2
+        if get_api_response(endpoint).status_code == 200:
+            # set, not toggled, so threads that both saw the dead one agree
+            with endpoint_lock:
+                current_endpoint = endpoint
             print(colored("[+] TTS Service available!", "green"))
         else:
             print(
@@ -157,8 +165,8 @@ def tts(
     # creating the audio file
     try:
         if len(text) < TEXT_BYTE_LIMIT:
-            audio = generate_audio((text), voice)
-            if current_endpoint == 0:
+            audio = generate_audio((text), voice, endpoint)
+            if endpoint == 0:
                 audio_base64_data = str(audio).split('"')[5]
             else:
                 audio_base64_data = str(audio).split('"')[3].split(",")[1]
@@ -174,8 +182,8 @@ def tts(
 
             # Define a thread function to generate audio for each text part
             def generate_audio_thread(text_part, index):
-                audio = generate_audio(text_part, voice)
-                if current_endpoint == 0:
+                audio = generate_audio(text_part, voice, endpoint)
+                if endpoint == 0:
                     base64_data = str(audio).split('"')[5]
                 else:
                     base64_data = str(audio).split('"')[3].split(",")[1]
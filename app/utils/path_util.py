@@ -4,12 +4,21 @@ import asyncio
 import hashlib
 import os
 import shutil
+import tempfile
 
 import aiohttp
 from loguru import logger
 from tenacity import retry, stop_after_attempt, wait_fixed
 
 
+def create_http_session() -> aiohttp.ClientSession:
+    """creates a pooled session, shared by all pexels queries and downloads of a job"""
+    connector = aiohttp.TCPConnector(
+        limit=32, limit_per_host=16, ttl_dns_cache=300, keepalive_timeout=60
+    )
+    return aiohttp.ClientSession(connector=connector)
+
+
 def text_to_sha256_hash(text):
     return hashlib.sha256(text.encode()).hexdigest()
 
@@ -29,26 +38,90 @@ def search_file(directory, file) -> str | None:
 
 @retry(stop=stop_after_attempt(5), wait=wait_fixed(5)) # type: ignore
 async def download_resource(
-    dir, url, cache_dir=videos_cache_path, disable_cache=False
+    dir,
+    url,
+    cache_dir=videos_cache_path,
+    disable_cache=False,
+    session: aiohttp.ClientSession | None = None,
 ) -> str:
     filename = os.path.basename(url)
     file_path = os.path.join(dir, filename)
 
+    # the cache scan and video sized copies below run in threads, so concurrent
+    # downloads keep streaming while one of them touches the disk. the cache is
+    # shared by batch jobs, entries are only ever replaced whole
     if not disable_cache:
-        file_cache_path = search_file(cache_dir, filename)
+        file_cache_path = await asyncio.to_thread(search_file, cache_dir, filename)
         if file_cache_path:
-            shutil.copy2(file_cache_path, file_path)
+            await asyncio.to_thread(copy_atomic, file_cache_path, file_path)
             logger.info(f"Found resource in cache: {file_cache_path}")
             return file_path
 
-    async with aiohttp.ClientSession() as session:
-        logger.info(f"Downloading resource from: {url}")
-        async with session.get(url) as response:
-            with open(file_path, "wb") as f:
-                f.write(await response.read())
-                logger.debug(f"Downloaded resource from: {url}")
+    if session is None:
+        async with create_http_session() as session:
+            return await _fetch_resource(session, url, file_path, cache_dir)
+
+    return await _fetch_resource(session, url, file_path, cache_dir)
+
+
+async def _fetch_resource(
+    session: aiohttp.ClientSession, url: str, file_path: str, cache_dir: str
+) -> str:
+    logger.info(f"Downloading resource from: {url}")
+    async with session.get(url) as response:
+        # stream to disk in chunks, so a video is never fully held in memory and
+        # the blocking writes run off the event loop. each download gets its own
+        # temp file, swapped in once complete, so two downloads of the same url
+        # never write into one file
+        f = tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(file_path), suffix=".part", delete=False
+        )
+        try:
+            with f:
+                async for chunk in response.content.iter_chunked(1 << 20):
+                    await asyncio.to_thread(f.write, chunk)
+            os.replace(f.name, file_path)
+        except BaseException:
+            os.remove(f.name)
+            raise
+        logger.debug(f"Downloaded resource from: {url}")
+
+    # save to cache audios
+    await asyncio.to_thread(copy_atomic, file_path, cache_dir)
+    return file_path
+
+
+def copy_atomic(src: str, dst: str) -> str:
+    """copy2 through a temp file in the destination dir, readers never see a partial file"""
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+
+    with tempfile.NamedTemporaryFile(
+        dir=os.path.dirname(dst), suffix=".part", delete=False
+    ) as f:
+        tmp_path = f.name
+    try:
+        shutil.copy2(src, tmp_path)
+        os.replace(tmp_path, dst)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return dst
+
+
+async def download_resources(
+    dir,
+    urls: list[str],
+    session: aiohttp.ClientSession | None = None,
+    return_exceptions=False,
+) -> list:
+    """downloads all urls concurrently, at most DL_CONCURRENCY at a time"""
+    semaphore = asyncio.Semaphore(max(1, int(os.getenv("DL_CONCURRENCY", 8))))
 
-                # save to cache audios
-                shutil.copy2(file_path, cache_dir)
-                return os.path.join(dir, os.path.basename(url))
+    async def _bounded(url: str):
+        async with semaphore:
+            return await download_resource(dir, url, session=session)
 
+    return await asyncio.gather(
+        *(_bounded(url) for url in urls), return_exceptions=return_exceptions
+    )
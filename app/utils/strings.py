@@ -2,9 +2,14 @@ import ffmpeg
 from loguru import logger
 import spacy
 
+import asyncio
+import functools
 import os
+import secrets
 import shutil
+import subprocess
 import tempfile
+import time
 from typing import Any
 from cuid2 import Cuid
 import ffmpeg
@@ -50,10 +55,15 @@ FFMPEG_TYPE = Any
 
 
 class FileClip:
-    def __init__(self, filepath: str, **kwargs):
+    def __init__(self, filepath: str, real_duration: float | None = None, **kwargs):
         self.filepath = filepath
         self.kwargs = kwargs
-        self.real_duration = get_clip_duration(self.filepath)
+        # skip the ffprobe call when the duration is already known
+        self.real_duration = (
+            real_duration
+            if real_duration is not None
+            else get_clip_duration(self.filepath)
+        )
         self.ffmpeg_clip: FFMPEG_TYPE = ffmpeg.input(filepath, **kwargs)
 
         if kwargs.get("t"):
@@ -61,7 +71,12 @@ class FileClip:
         else:
             self.duration = self.real_duration
 
-    def duplicate(self) -> "FileClip":
+    def duplicate(self, **kwargs) -> "FileClip":
+        """
+        Returns a clip of the same file under a new path, ffmpeg-python merges inputs
+        with identical args into one node, which can only be consumed once.
+        kwargs override the ffmpeg input args of this clip.
+        """
         duplicates_dir = os.path.join(os.path.dirname(self.filepath), "duplicates")
         os.makedirs(duplicates_dir, exist_ok=True)
 
@@ -70,9 +85,88 @@ class FileClip:
             dir=duplicates_dir,
             suffix=f"_{os.path.basename(self.filepath)}",
         ) as temp_file:
+            pass
+
+        # a hard link is instant, fall back to a copy across filesystems
+        try:
+            os.remove(temp_file.name)
+            os.link(self.filepath, temp_file.name)
+        except OSError:
             shutil.copyfile(self.filepath, temp_file.name)
 
-        return FileClip(temp_file.name, **self.kwargs)
+        return FileClip(
+            temp_file.name,
+            real_duration=self.real_duration,
+            **{**self.kwargs, **kwargs},
+        )
+
+
+@functools.lru_cache
+def ffmpeg_encoders() -> frozenset[str]:
+    """the names of the encoders the installed ffmpeg was built with, listed once"""
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-encoders"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        logger.warning("Failed to list ffmpeg encoders")
+        return frozenset()
+
+    # lines look like: " V....D libx264    libx264 H.264 / AVC ..."
+    encoders = set()
+    for line in result.stdout.splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and len(parts[0]) == 6:
+            encoders.add(parts[1])
+    return frozenset(encoders)
+
+
+# hardware h264 encoders, in order of preference
+HW_ENCODERS = ["h264_nvenc", "h264_videotoolbox"]
+
+
+@functools.lru_cache(maxsize=1)
+def detect_hw_encoder() -> str | None:
+    """
+    Returns the first hardware encoder that actually works on this host. Being listed
+    by ffmpeg isn't enough (eg: nvenc builds on a machine without a gpu), so each
+    candidate encodes a short test clip.
+    """
+    for encoder in HW_ENCODERS:
+        if encoder not in ffmpeg_encoders():
+            continue
+        try:
+            subprocess.run(
+                [
+                    "ffmpeg",
+                    "-hide_banner",
+                    "-loglevel",
+                    "error",
+                    "-f",
+                    "lavfi",
+                    "-i",
+                    "color=size=256x256:duration=0.1",
+                    "-c:v",
+                    encoder,
+                    "-f",
+                    "null",
+                    "-",
+                ],
+                capture_output=True,
+                check=True,
+                timeout=30,
+            )
+        except (OSError, subprocess.SubprocessError):
+            logger.debug(f"Hardware encoder {encoder} is listed but not usable")
+            continue
+
+        logger.info(f"Using hardware encoder: {encoder}")
+        return encoder
+
+    return None
 
 
 def get_video_size(input_path: str) -> tuple[int, int]:
@@ -101,6 +195,50 @@ def get_clip_duration(file_path):
     return duration
 
 
+async def probe_duration(file_path: str) -> float:
+    """same as get_clip_duration, without blocking the event loop on ffprobe"""
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            "ffprobe",
+            "-v",
+            "error",
+            "-show_entries",
+            "format=duration",
+            "-of",
+            "default=nw=1:nk=1",
+            file_path,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        out, _ = await proc.communicate()
+        duration = round(float(out), 2)
+    except Exception:
+        logger.warning(f"Failed to get duration of {file_path}")
+        duration = 0
+
+    return duration
+
+
+async def probe_durations(file_paths: list[str]) -> list[float]:
+    """probes all files at once, results are in the same order as file_paths"""
+    return list(await asyncio.gather(*(probe_duration(p) for p in file_paths)))
+
+
+async def gather_or_cancel(*coros) -> list:
+    """
+    like asyncio.gather, but the first failure cancels the others. a single error
+    is raised as is, not wrapped in an ExceptionGroup, so callers can still catch it
+    """
+    try:
+        async with asyncio.TaskGroup() as tg:
+            tasks = [tg.create_task(coro) for coro in coros]
+    except* Exception as eg:
+        if len(eg.exceptions) == 1:
+            raise eg.exceptions[0] from None
+        raise
+    return [task.result() for task in tasks]
+
+
 def web_color_to_ass(color_code: str, alpha: str = "00") -> str:
     # Strip the `#` if it's there
     color_code = color_code.lstrip("#")
@@ -146,3 +284,20 @@ def make_cuid(prefix: str) -> str:
     """
     id = Cuid(length=23).generate()
     return f"{prefix}{id}"
+
+
+CROCKFORD_BASE32 = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+
+def make_ulid() -> str:
+    """
+    Generates a ULID: a 48 bit millisecond timestamp followed by 80 random bits,
+    as 26 Crockford base32 chars. Unlike uuid4, lexical order is creation order,
+    so job directories and logs sort by time.
+    """
+    value = (time.time_ns() // 1_000_000) << 80 | secrets.randbits(80)
+    chars = []
+    for _ in range(26):
+        value, index = divmod(value, 32)
+        chars.append(CROCKFORD_BASE32[index])
+    return "".join(reversed(chars))
@@ -1,3 +1,5 @@
+import asyncio
+import contextlib
 import multiprocessing
 import os
 import random
@@ -46,6 +48,7 @@ class VideoGeneratorConfig(BaseModel):
     bg_color: str | None = None
     subtitles_position: str = "center,center"
     threads: int = multiprocessing.cpu_count()
+    """ threads for the final encode, shared by the encoder and the filter graph """
 
     watermark_path_or_text: str | None = "VoidFace"
     watermark_opacity: float = 0.5
@@ -57,6 +60,20 @@ class VideoGeneratorConfig(BaseModel):
 
     color_effect: str = "gray"
 
+    video_codec: str = "libx264"
+    """ ffmpeg video encoder, eg: libx264, libsvtav1 """
+
+    encoder_preset: str | int | None = "veryfast"
+    """ encoder speed preset, names for x264 (veryfast), numbers for svt-av1 (0-13), p1-p7 for nvenc """
+
+    encoder_tune: str | None = None
+    """ encoder tuning, eg: zerolatency for x264, None keeps the encoder default """
+
+    crf: int | None = None
+    """ constant rate factor, None keeps the encoder default """
+
+    pix_fmt: str = "yuv420p"
+
 
 class VideoGenerator:
     def __init__(
@@ -76,6 +93,7 @@ class VideoGenerator:
                 limit=2,
                 min_dur=10,
                 query=search_term,
+                session=self.base_engine.http_session,
             )
             return urls[0] if len(urls) > 0 else None
         except Exception as e:
@@ -130,15 +148,17 @@ class VideoGenerator:
             # Fix aspect ratio issues by setting consistent SAR
             clip = clip.filter("setsar", ratio="1")
 
-            # apply gray effect for motivational video
-            if (
-                self.config.color_effect == "gray"
-                and self.base_engine.config.video_type == "motivational"
-            ):
-                clip = clip.filter("format", "gray")
-
             processed_clips.append(clip)
         final_video = ffmpeg.concat(*processed_clips, v=1, a=0)
+
+        # apply gray effect for motivational video, once on the joined stream
+        # rather than one filter instance per clip
+        if (
+            self.config.color_effect == "gray"
+            and self.base_engine.config.video_type == "motivational"
+        ):
+            final_video = final_video.filter("format", "gray")
+
         return final_video
 
     async def generate_video(
@@ -177,18 +197,31 @@ class VideoGenerator:
             # No background music, just add the speech audio
             video_stream = ffmpeg.concat(video_stream, speech_filter, v=1, a=1)
 
+        encoder_args = {}
+        if self.config.encoder_preset is not None:
+            encoder_args["preset"] = self.config.encoder_preset
+        if self.config.crf is not None:
+            encoder_args["crf"] = self.config.crf
+        if self.config.encoder_tune:
+            encoder_args["tune"] = self.config.encoder_tune
+
         output = ffmpeg.output(
             video_stream,
             output_path,
-            vcodec="libx264",
+            vcodec=self.config.video_codec,
             acodec="aac",
-            preset="veryfast",
-            threads=2,
+            pix_fmt=self.config.pix_fmt,
+            threads=self.config.threads,
+            **encoder_args,
             # loglevel="quiet",
-        )
+        ).global_args("-filter_complex_threads", str(self.config.threads))
 
         logger.debug(f"FFMPEG CMD: {output.get_args()}")
-        output.run(overwrite_output=True, cmd=self.ffmpeg_cmd)
+        # encoding takes a while, keep the event loop free meanwhile
+        async with self.base_engine.encode_semaphore or contextlib.nullcontext():
+            await asyncio.to_thread(
+                output.run, overwrite_output=True, cmd=self.ffmpeg_cmd
+            )
 
         logger.info("Video generation complete.")
         return output_path
@@ -297,12 +330,12 @@ class VideoGenerator:
         logger.debug("Creating GIF...")
         gif_path = f"{self.cwd}/{self.job_id}.gif"
 
-        (
+        stream = (
             ffmpeg.input(master_video_path, ss=start_time, t=end_time - start_time)
             .filter("fps", fps=6)
             .filter("scale", "iw/2", "ih/2")
             .output(gif_path, format="gif", loop=0, pix_fmt="rgb24")
-            .run(overwrite_output=True)
         )
+        await asyncio.to_thread(stream.run, overwrite_output=True)
 
         return gif_path
\ No newline at end of file
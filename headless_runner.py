@@ -1,9 +1,17 @@
+import argparse
 import asyncio
-from uuid import uuid4
+import json
+import os
+import sys
 
 from loguru import logger
 
+from app.base import StartResponse
+from app.prompt_gen import PromptGenerator, create_llm_http_client
 from app.reels_maker import ReelsMaker, ReelsMakerConfig
+from app.synth_gen import SynthConfig
+from app.utils.path_util import create_http_session
+from app.utils.strings import detect_hw_encoder, ffmpeg_encoders, make_ulid
 from app.video_gen import VideoGeneratorConfig
 
 # Note: This script assumes you have a .env file in the root directory
@@ -12,23 +20,62 @@ from app.video_gen import VideoGeneratorConfig
 # PEXELS_API_KEY="..."
 # ELEVENLABS_API_KEY="..."
 
+DEFAULT_PROMPT = "The script should start off with : One of the best AI tool in 2025 is Composio's MCP, a platform that lets you directly import MCP Servers with a url and use them in Claude, Cursor, Windsurf and more."
 
-async def main():
+
+def get_loop_factory():
     """
-    Runs the ReelsMaker without the Streamlit frontend.
+    uvloop has faster socket and subprocess dispatch than the default loop.
+    It's optional (and unavailable on Windows), fall back to the stock loop.
+    """
+    try:
+        import uvloop
+    except ImportError:
+        return None
+
+    logger.debug("Using uvloop event loop")
+    return uvloop.new_event_loop
+
+
+def get_encoder_config() -> dict:
+    """
+    A working gpu encoder (nvenc, videotoolbox) is preferred, then svt-av1 at
+    preset 12 which encodes much faster than x264 at similar quality, otherwise
+    keep the x264 defaults.
+    With REELS_DEV=1, trade quality for the fastest possible x264 encode.
+    """
+    if os.getenv("REELS_DEV") == "1":
+        return dict(
+            video_codec="libx264", encoder_preset="ultrafast", encoder_tune="zerolatency"
+        )
+    hw_encoder = detect_hw_encoder()
+    if hw_encoder == "h264_nvenc":
+        return dict(video_codec=hw_encoder, encoder_preset="p4")
+    if hw_encoder:
+        # videotoolbox has no preset option
+        return dict(video_codec=hw_encoder, encoder_preset=None)
+    if "libsvtav1" in ffmpeg_encoders():
+        return dict(video_codec="libsvtav1", encoder_preset=12, crf=35)
+    return dict(video_codec="libx264", encoder_preset="veryfast")
+
+
+def build_config(prompt: str | None = None, **overrides) -> ReelsMakerConfig:
     """
-    logger.info("Starting headless ReelsMaker...")
+    Configuration for headless video generation, overrides replace top level fields.
+    The default prompt is only used when neither a prompt nor a script is given.
+    """
+    if prompt is None and not overrides.get("script"):
+        prompt = DEFAULT_PROMPT
 
-    # 1. Create a configuration object
-    # Configuration for headless video generation.
-    config = ReelsMakerConfig(
-        job_id=str(uuid4()),
-        prompt="The script should start off with : One of the best AI tool in 2025 is Composio's MCP, a platform that lets you directly import MCP Servers with a url and use them in Claude, Cursor, Windsurf and more.",
+    fields = dict(
+        job_id=make_ulid(),
+        prompt=prompt,
         script_duration=10,
         use_subway_surfers_background=True,  # 🎮 Enable Subway Surfers Background mode!
         subway_surfers_videos=[
             "./Subway Surfers 2024 Gameplay 4K.mp4",  # Use local Subway Surfers video
         ],
+        synth_config=SynthConfig(),
         video_gen_config=VideoGeneratorConfig(
             fontsize=2,
             stroke_color="#000000",
@@ -42,23 +89,131 @@ async def main():
             color_effect="vibrant",
         ),
     )
+    fields.update(overrides)
+    return ReelsMakerConfig(**fields)
+
+
+def load_configs(prompts_path: str) -> list[ReelsMakerConfig]:
+    """reads a JSONL file, one job per line: {"prompt": "...", ...overrides}"""
+    configs = []
+    with open(prompts_path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            configs.append(build_config(**json.loads(line)))
+    return configs
+
+
+def missing_env_vars(configs: list[ReelsMakerConfig]) -> list[str]:
+    """the api keys the jobs will need that aren't set"""
+    # the prompt generator is always created, and script-only jobs still ask
+    # openai for their search terms
+    required = {"OPENAI_API_KEY"}
+    for config in configs:
+        uses_own_videos = config.video_paths or (
+            config.use_subway_surfers_background and config.subway_surfers_videos
+        )
+        if not uses_own_videos:
+            required.add("PEXELS_API_KEY")
+        if config.synth_config.voice_provider == "elevenlabs":
+            required.add("ELEVENLABS_API_KEY")
+
+    return sorted(key for key in required if not os.getenv(key))
 
-    logger.info(f"Using config: {config.model_dump_json(indent=2)}")
 
-    # 2. Instantiate ReelsMaker
-    reels_maker = ReelsMaker(config)
+async def main(
+    configs: list[ReelsMakerConfig],
+) -> list[StartResponse | BaseException]:
+    """
+    Runs the ReelsMaker without the Streamlit frontend.
+
+    Jobs run concurrently, at most REELS_CONCURRENCY at a time, so one job's
+    network waits overlap with another job's ffmpeg work. Fetching assets is
+    network bound and encoding is cpu bound, so the final encodes get their own
+    limit, ENCODE_CONCURRENCY: jobs keep fetching ahead while others encode.
+    """
+    if not configs:
+        logger.warning("No jobs to run")
+        return []
+
+    # fail before any work is done rather than minutes into a job
+    missing = missing_env_vars(configs)
+    if missing:
+        raise SystemExit(f"Missing env: {missing}")
+
+    logger.info(f"Starting headless ReelsMaker with {len(configs)} job(s)...")
+
+    # a limit of 0 would leave every job waiting forever
+    reels_concurrency = max(1, int(os.getenv("REELS_CONCURRENCY", "4")))
+    semaphore = asyncio.Semaphore(reels_concurrency)
+
+    # split the cores between the encodes that can run at once, never more than
+    # the jobs running at once, so a single job gets all of them
+    cpu_count = os.cpu_count() or 2
+    default_encodes = min(len(configs), reels_concurrency, max(1, cpu_count // 2))
+    encode_limit = max(1, int(os.getenv("ENCODE_CONCURRENCY", default_encodes)))
+    encode_semaphore = asyncio.Semaphore(encode_limit)
 
-    # 3. Start the video generation process
+    # the encoder is detected once, for the jobs that didn't pick a codec
+    if any("video_codec" not in c.video_gen_config.model_fields_set for c in configs):
+        encoder_config = await asyncio.to_thread(get_encoder_config)
+        for config in configs:
+            if "video_codec" not in config.video_gen_config.model_fields_set:
+                for key, value in encoder_config.items():
+                    setattr(config.video_gen_config, key, value)
 
-    logger.info("Generating reel about AI...")
-    output = await reels_maker.start()
-    logger.success("Reel generated successfully!")
-    logger.info(f"Output video path: {output.video_file_path}")
-    logger.info("Reel generated successfully!")
-    logger.info(f"Output video path: {output.video_file_path}")
-        
+    encode_threads = max(1, cpu_count // encode_limit)
+    for config in configs:
+        if "threads" not in config.video_gen_config.model_fields_set:
+            config.video_gen_config.threads = encode_threads
 
+    async def _run_one(config: ReelsMakerConfig) -> StartResponse:
+        async with semaphore:
+            logger.opt(lazy=True).info(
+                "Using config: {c}", c=lambda: config.model_dump_json(indent=2)
+            )
+
+            reels_maker = ReelsMaker(
+                config, prompt_generator, encode_semaphore, http_session
+            )
+
+            logger.info(f"Generating reel for job: {config.job_id}")
+            output = await reels_maker.start()
+            logger.success("Reel generated successfully!")
+            logger.info(f"Output video path: {output.video_file_path}")
+            return output
+
+    # one connection pool for the pexels searches and downloads of every job,
+    # connections to the same hosts are reused from one job to the next. both
+    # pools are opened and closed on this loop
+    async with (
+        create_http_session() as http_session,
+        create_llm_http_client() as llm_http_client,
+    ):
+        # one prompt generator (llm cache + client) for all jobs
+        prompt_generator = PromptGenerator(http_client=llm_http_client)
+        results = await asyncio.gather(
+            *(_run_one(config) for config in configs), return_exceptions=True
+        )
+
+    for config, result in zip(configs, results):
+        if isinstance(result, BaseException):
+            logger.opt(exception=result).error(f"Job {config.job_id} failed")
+
+    return results
 
 
 if __name__ == "__main__":
-    asyncio.run(main()) 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate reels without the UI")
+    parser.add_argument(
+        "--prompts",
+        help="JSONL file with one job per line, eg: {\"prompt\": \"...\"}",
+    )
+    args = parser.parse_args()
+
+    configs = load_configs(args.prompts) if args.prompts else [build_config()]
+    with asyncio.Runner(loop_factory=get_loop_factory()) as runner:
+        results = runner.run(main(configs))
+
+    if any(isinstance(result, BaseException) for result in results):
+        sys.exit(1)
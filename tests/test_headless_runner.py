@@ -0,0 +1,56 @@
+import json
+
+from headless_runner import (
+    DEFAULT_PROMPT,
+    build_config,
+    load_configs,
+    missing_env_vars,
+)
+
+
+def test_build_config_default_prompt():
+    config = build_config()
+    assert config.prompt == DEFAULT_PROMPT
+    assert config.script is None
+
+
+def test_build_config_script_only():
+    config = build_config(script="A script to narrate as is.")
+    assert config.prompt is None
+    assert config.script == "A script to narrate as is."
+
+
+def test_build_config_overrides():
+    config = build_config("A prompt", script_duration=20)
+    assert config.prompt == "A prompt"
+    assert config.script_duration == 20
+
+
+def test_load_configs(tmp_path):
+    prompts_path = tmp_path / "prompts.jsonl"
+    lines = [
+        json.dumps({"prompt": "First prompt"}),
+        "",
+        json.dumps({"script": "Second script."}),
+    ]
+    prompts_path.write_text("\n".join(lines) + "\n")
+
+    configs = load_configs(str(prompts_path))
+    assert [c.prompt for c in configs] == ["First prompt", None]
+    assert [c.script for c in configs] == [None, "Second script."]
+    assert len({c.job_id for c in configs}) == 2
+
+
+def test_missing_env_vars(monkeypatch):
+    for key in ("OPENAI_API_KEY", "PEXELS_API_KEY", "ELEVENLABS_API_KEY"):
+        monkeypatch.delenv(key, raising=False)
+
+    # script-only jobs still need openai for the search terms
+    config = build_config(script="A script.", use_subway_surfers_background=False)
+    assert missing_env_vars([config]) == ["OPENAI_API_KEY", "PEXELS_API_KEY"]
+
+    config = build_config(video_paths=["video.mp4"])
+    assert missing_env_vars([config]) == ["OPENAI_API_KEY"]
+
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    assert missing_env_vars([config]) == []
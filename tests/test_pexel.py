@@ -0,0 +1,24 @@
+from app.pexel import pick_video_file
+
+
+def _file(width: int, height: int) -> dict:
+    return {
+        "link": f"https://videos.pexels.com/video-files/1/{width}x{height}.mp4",
+        "width": width,
+        "height": height,
+    }
+
+
+def test_pick_video_file_smallest_portrait():
+    files = [_file(2160, 3840), _file(1080, 1920), _file(720, 1280)]
+    assert pick_video_file(files) == files[1]["link"]
+
+
+def test_pick_video_file_landscape_does_not_cover():
+    # a 1920x1080 rendition would be stretched to fill 1080x1920
+    files = [_file(1920, 1080), _file(1440, 2560)]
+    assert pick_video_file(files) == files[1]["link"]
+
+
+def test_pick_video_file_no_candidates():
+    assert pick_video_file([{"link": "https://example.com/a.mp4"}]) is None
@@ -1,5 +1,5 @@
 import os
-from app.reels_maker import ReelsMaker, ReelsMakerConfig
+from app.reels_maker import ReelsMaker, ReelsMakerConfig, plan_clip_slices
 import pytest
 
 
@@ -27,3 +27,19 @@ async def test_reels_maker():
     reels_maker = ReelsMaker(config)
     video_path = await reels_maker.start()
     return video_path
+
+
+def test_plan_clip_slices():
+    plan = plan_clip_slices(durations=[10, 3, 7], video_duration=23, max_clip_duration=5)
+    assert plan == [(0, 5), (1, 3), (2, 5), (0, 5), (1, 3), (2, 2)]
+    assert sum(d for _, d in plan) == 23
+
+
+def test_plan_clip_slices_float_remainder():
+    plan = plan_clip_slices(durations=[3.3, 3.3, 3.3], video_duration=9.9, max_clip_duration=5)
+    assert plan == [(0, 3.3), (1, 3.3), (2, 3.3)]
+
+
+def test_plan_clip_slices_no_duration():
+    with pytest.raises(ValueError):
+        plan_clip_slices(durations=[0, 0], video_duration=10, max_clip_duration=5)